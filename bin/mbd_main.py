@@ -10,7 +10,8 @@ def main():
 
     GraphAnalyzer.print_stats(G)
 
-    # choose capacity metric: "capacity" (default), or "capacity_throughput", or "capacity_latency"
+    # choose capacity metric: "capacity" (default), or "capacity_throughput", or "capacity_latency",
+    # or "capacity_int" (capacity as a fixed-point integer, see graph_builder.CAPACITY_SCALE)
     capacity_attr = "capacity"  # change to "capacity_throughput" to prefer throughput explicitly
 
     source = "api-gateway"
@@ -22,11 +23,7 @@ def main():
     cut_value, (S, T) = GraphAnalyzer.min_cut(G, source, sink, capacity_attr)
     print(f"Min cut value ({capacity_attr}) between {source} and {sink}: {cut_value}")
 
-    bottlenecks = []
-    for u in S:
-        for v in G.successors(u):
-            if v in T:
-                bottlenecks.append((u, v))
+    bottlenecks = GraphAnalyzer.cut_edges(G, S, T)
 
     viz = GraphVisualizer(output_dir="out")
     viz.render_service_graph(G, filename="service_graph.png", bottlenecks=bottlenecks)
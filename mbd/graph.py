@@ -1,13 +1,18 @@
 """Wrapper exposing graph-related APIs from the `mbd.graph` package."""
-from mbd.graph.graph_builder import GraphBuilder
+from mbd.graph.graph_builder import GraphBuilder, SlidingGraph
 from mbd.graph.analyzer import GraphAnalyzer
 from mbd.graph.visualizer import GraphVisualizer
-from mbd.graph.bottleneck import analyze_time_windows, aggregate_bottlenecks
+from mbd.graph.bottleneck import WindowStream, analyze_time_windows, stream_time_windows, aggregate_bottlenecks
+from mbd.graph.serialize import graph_to_visjs
 
 __all__ = [
     "GraphBuilder",
+    "SlidingGraph",
     "GraphAnalyzer",
     "GraphVisualizer",
     "analyze_time_windows",
+    "WindowStream",
+    "stream_time_windows",
     "aggregate_bottlenecks",
+    "graph_to_visjs",
 ]
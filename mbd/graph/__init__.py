@@ -1,12 +1,17 @@
-from .graph_builder import GraphBuilder
+from .graph_builder import GraphBuilder, SlidingGraph
 from .analyzer import GraphAnalyzer
 from .visualizer import GraphVisualizer
-from .bottleneck import analyze_time_windows, aggregate_bottlenecks
+from .bottleneck import WindowStream, analyze_time_windows, stream_time_windows, aggregate_bottlenecks
+from .serialize import graph_to_visjs
 
 __all__ = [
     "GraphBuilder",
+    "SlidingGraph",
     "GraphAnalyzer",
     "GraphVisualizer",
     "analyze_time_windows",
+    "WindowStream",
+    "stream_time_windows",
     "aggregate_bottlenecks",
+    "graph_to_visjs",
 ]
@@ -1,4 +1,5 @@
 import networkx as nx
+from networkx.algorithms.flow import edmonds_karp
 
 
 class GraphAnalyzer:
@@ -13,7 +14,7 @@ class GraphAnalyzer:
         for u, v in G.edges:
             avg = G[u][v].get("avg_latency", 0.0)
             cap = G[u][v].get("capacity", 0.0)
-            calls = G[u][v].get("count", len(G[u][v].get("times", [])))
+            calls = G[u][v].get("count", 0)
             print(f"{u} → {v}: calls={calls}, avg={avg:.2f} ms, cap={cap:.4f}")
 
     @staticmethod
@@ -25,3 +26,32 @@ class GraphAnalyzer:
     def min_cut(G: nx.DiGraph, source: str, sink: str, capacity_attr: str = "capacity"):
         """Compute minimum cut using the specified capacity attribute on edges."""
         return nx.minimum_cut(G, source, sink, capacity=capacity_attr)
+
+    @staticmethod
+    def max_flow_and_cut(G: nx.DiGraph, source: str, sink: str, capacity_attr: str = "capacity", flow_func=edmonds_karp):
+        """Compute max flow value and minimum cut from a single flow-solver run.
+
+        Returns (flow_value, (S, T)); the cut value equals the flow value. The
+        partition is the same one `nx.minimum_cut` returns: T holds the nodes
+        that can still reach `sink` in the residual network.
+
+        `flow_func` is any networkx flow function. Edmonds-Karp is the default:
+        on sparse service graphs (tens to thousands of edges) it beats
+        preflow-push and Dinitz, whose setup cost outweighs their better bounds.
+        """
+        R = flow_func(G, source, sink, capacity=capacity_attr, value_only=True)
+        flow_value = R.graph["flow_value"]
+
+        # drop saturated edges; whatever still reaches the sink is on the sink side
+        cutset = [(u, v) for u, v, d in R.edges(data=True) if d["flow"] == d["capacity"]]
+        R.remove_edges_from(cutset)
+        T = set(dict(nx.shortest_path_length(R, target=sink)))
+        S = set(R) - T
+        return flow_value, (S, T)
+
+    @staticmethod
+    def cut_edges(G: nx.DiGraph, S, T):
+        """Return the edges crossing a (S, T) cut partition from S to T."""
+        if not isinstance(T, (set, frozenset)):
+            T = frozenset(T)
+        return [(u, v) for u, v in G.out_edges(S) if v in T]
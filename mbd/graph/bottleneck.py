@@ -1,87 +1,298 @@
 """Bottleneck detection utilities: run sliding-window max-flow/min-cut and aggregate results."""
 from __future__ import annotations
 
-from datetime import datetime, timedelta
-from typing import List, Tuple, Dict, Any
+from bisect import bisect_left, bisect_right, insort
+from collections import Counter, deque
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime, timezone
+from operator import itemgetter
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Tuple
 
 import networkx as nx
 
 from mbd.model.record import LogRecord
-from mbd.graph.graph_builder import GraphBuilder
+from mbd.graph.graph_builder import SlidingGraph
 from mbd.graph.analyzer import GraphAnalyzer
 
 
-def parse_iso_z(s: str) -> datetime:
-    return datetime.fromisoformat(s.replace("Z", "+00:00"))
+def sort_by_time(records: List[LogRecord]) -> Tuple[List[LogRecord], List[float]]:
+    """Parse every timestamp once and return (records, epoch seconds), both sorted by time."""
+    times = [r.epoch() for r in records]
+    # logs are normally appended in time order: skip the reorder when they are
+    if all(a <= b for a, b in zip(times, times[1:])):
+        return list(records), times
+    order = sorted(range(len(records)), key=times.__getitem__)
+    return [records[i] for i in order], [times[i] for i in order]
 
 
-def sliding_windows(records: List[LogRecord], window_seconds: int, step_seconds: int):
-    if not records:
+def window_slice(times: List[float], start: float, end: float, lo: int = 0) -> Tuple[int, int]:
+    """Return (lo, hi) such that `records[lo:hi]` have start <= ts <= end.
+
+    `times` must be sorted; passing the previous window's `lo` narrows the search.
+    """
+    lo = bisect_left(times, start, lo)
+    return lo, bisect_right(times, end, lo)
+
+
+def sliding_windows(times: List[float], window_seconds: int, step_seconds: int):
+    """Yield (start, end, lo, hi) for each window over sorted epoch `times`.
+
+    `records[lo:hi]` are the records with start <= ts <= end.
+    """
+    if not times:
         return
 
-    times = [parse_iso_z(r.timestamp) for r in records]
-    start = min(times)
-    end = max(times)
-    current = start
+    current = times[0]
+    end = times[-1]
+    lo = 0
     while current <= end:
-        window_end = current + timedelta(seconds=window_seconds)
-        yield current, window_end
-        current = current + timedelta(seconds=step_seconds)
+        window_end = current + window_seconds
+        lo, hi = window_slice(times, current, window_end, lo)
+        yield current, window_end, lo, hi
+        current = current + step_seconds
 
 
-def records_in_window(records: List[LogRecord], start: datetime, end: datetime) -> List[LogRecord]:
-    out = []
-    for r in records:
-        ts = parse_iso_z(r.timestamp)
-        if start <= ts <= end:
-            out.append(r)
-    return out
+def adaptive_windows(times: List[float], fraction: float = 0.1):
+    """Yield (start, end, lo, hi) for windows spanning a fixed share of unique timestamps.
 
+    Every window covers `fraction` of the distinct timestamps in sorted `times`,
+    so bursty regions get narrow windows, sparse regions wide ones, and no
+    window is ever empty.
+    """
+    if not times:
+        return
+
+    unique_ts = sorted(set(times))
+    n = max(1, int(fraction * len(unique_ts)))
+    last = len(unique_ts) - 1
+    # stop before `last` so the final window ends at unique_ts[last] exactly once
+    # instead of adding a zero-width (last, last) window
+    for i in range(0, max(last, 1), n):
+        start = unique_ts[i]
+        window_end = unique_ts[min(i + n, last)]
+        lo, hi = window_slice(times, start, window_end)
+        yield start, window_end, lo, hi
 
-def analyze_time_windows(records: List[LogRecord], source: str, sink: str, window_seconds: int = 60, step_seconds: int = 30, capacity_attr: str = "capacity") -> List[Dict[str, Any]]:
+
+def analyze_time_windows(records: List[LogRecord], source: str, sink: str, window_seconds: int = 60, step_seconds: int = 30, capacity_attr: str = "capacity", adaptive: bool = False, workers: int = 1) -> List[Dict[str, Any]]:
     """Run sliding-window analysis. Returns list of dicts with window start/end, flow_value, min_cut_edges.
 
     Each dict: {"start": datetime, "end": datetime, "flow": float, "min_cut": [(u,v), ...]}
+
+    With `adaptive=True` windows hold a fixed share of unique timestamps
+    (see `adaptive_windows`) and `window_seconds`/`step_seconds` are ignored.
+    With `workers > 1` the windows are split into that many contiguous runs
+    analyzed in separate processes (flow solving is GIL-bound pure Python).
     """
-    results = []
-    for start, end in sliding_windows(records, window_seconds, step_seconds):
-        window_records = records_in_window(records, start, end)
-        if not window_records:
-            results.append({"start": start, "end": end, "flow": 0.0, "min_cut": []})
-            continue
+    records, times = sort_by_time(records)
 
-        G = GraphBuilder.build_graph(window_records)
+    if adaptive:
+        windows = list(adaptive_windows(times))
+    else:
+        windows = list(sliding_windows(times, window_seconds, step_seconds))
 
-        # ensure source and sink are present
-        if source not in G.nodes or sink not in G.nodes:
-            results.append({"start": start, "end": end, "flow": 0.0, "min_cut": []})
-            continue
+    if workers <= 1 or len(windows) < 2:
+        return _analyze_windows(records, times, windows, source, sink, capacity_attr)
+
+    # each process gets one contiguous run of windows plus only the records they
+    # cover, and keeps its own SlidingGraph across that run
+    size = -(-len(windows) // workers)
+    results = []
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        futures = []
+        for i in range(0, len(windows), size):
+            run = windows[i:i + size]
+            base, top = run[0][2], run[-1][3]
+            rebased = [(s, e, lo - base, hi - base) for s, e, lo, hi in run]
+            futures.append(pool.submit(_analyze_windows, records[base:top], times[base:top], rebased, source, sink, capacity_attr))
+        for future in futures:
+            results.extend(future.result())
+    return results
 
-        try:
-            flow_value, flow_dict = GraphAnalyzer.max_flow(G, source, sink, capacity_attr)
-            cut_value, (S, T) = GraphAnalyzer.min_cut(G, source, sink, capacity_attr)
-        except Exception:
-            # if algorithm fails (disconnected, etc.)
-            results.append({"start": start, "end": end, "flow": 0.0, "min_cut": []})
+
+def _analyze_windows(records: List[LogRecord], times: List[float], windows: List[Tuple[float, float, int, int]], source: str, sink: str, capacity_attr: str) -> List[Dict[str, Any]]:
+    """Analyze consecutive (start, end, lo, hi) windows over sorted `records`/`times`."""
+    results = []
+    sliding = SlidingGraph()
+    prev_lo = prev_hi = 0
+    for start_ts, end_ts, lo, hi in windows:
+        # same slice as the previous window: same graph, so reuse its flow and cut
+        if results and (lo, hi) == (prev_lo, prev_hi):
+            results.append(_reuse_result(results[-1], start_ts, end_ts))
             continue
 
-        # collect min-cut edges
-        bottlenecks = []
-        for u in S:
-            for v in G.successors(u):
-                if v in T:
-                    bottlenecks.append((u, v))
+        # retire records that slid out of the window and add the ones that entered it
+        duration = times[hi - 1] - times[lo] if hi > lo else 0.0
+        G = sliding.apply_delta(records[max(prev_hi, lo):hi], records[prev_lo:min(lo, prev_hi)], duration)
+        prev_lo, prev_hi = lo, hi
 
-        results.append({"start": start, "end": end, "flow": flow_value, "min_cut": bottlenecks, "cut_value": cut_value})
+        results.append(_window_result(G, start_ts, end_ts, source, sink, capacity_attr))
 
     return results
 
 
+class WindowStream:
+    """Push-based sliding-window analysis that keeps its state between calls.
+
+    Records are fed with `push` as they arrive; each call only touches the
+    new records and the ones that slid out of the open window (the window
+    graph is a `SlidingGraph`), so the cost per call is proportional to the
+    delta, not to the history. `push` returns the windows the new records
+    closed, `peek` the open window so far and `flush` closes the rest once
+    the input ends. Records should arrive roughly in time order. A late
+    record that falls in the open window still counts there (it is slotted
+    in by timestamp, also after a `peek`), but closed windows are never
+    revisited: an overlapping closed window that should have held it stays
+    without it, and a record older than the open window is dropped. Both
+    cases are counted in `late`.
+    """
+
+    def __init__(self, source: str, sink: str, window_seconds: int = 60, step_seconds: int = 30, capacity_attr: str = "capacity"):
+        self.source = source
+        self.sink = sink
+        self.window_seconds = window_seconds
+        self.step_seconds = step_seconds
+        self.capacity_attr = capacity_attr
+
+        self.sliding = SlidingGraph()
+        self._in_window = deque()  # (ts, record) currently counted in the graph
+        self._pending = deque()    # (ts, record) seen but not yet added to the graph
+        self._current = None       # start of the open window
+        self._last_ts = None
+        self._prev = None
+        self._closed_end = None    # end of the last closed window
+        self.late = 0              # records that arrived after a window they belong to closed
+
+    @property
+    def graph(self) -> nx.DiGraph:
+        """Graph of the records in the open window, as of the last `peek`/close."""
+        return self.sliding.graph
+
+    def push(self, records: Iterable[LogRecord]) -> List[Dict[str, Any]]:
+        """Add records; return the results of the windows they closed."""
+        closed = []
+        for r in records:
+            ts = r.epoch()
+            if self._current is None:
+                self._current = ts
+            elif ts < self._current and ts < self._last_ts:
+                # older than the open window (and out of order): no window will take it
+                self.late += 1
+                continue
+            elif self._closed_end is not None and ts <= self._closed_end:
+                # it counts in the open window, but an overlapping one already closed without it
+                self.late += 1
+            # this record lies past the open window: that window is complete
+            while ts > self._current + self.window_seconds:
+                closed.append(self._close())
+            if self._pending and ts < self._pending[-1][0]:
+                insort(self._pending, (ts, r), key=itemgetter(0))
+            else:
+                self._pending.append((ts, r))
+            if self._last_ts is None or ts > self._last_ts:
+                self._last_ts = ts
+        return closed
+
+    def peek(self) -> Optional[Dict[str, Any]]:
+        """Result for the open window with the records seen so far, without closing it."""
+        if self._current is None:
+            return None
+        return self._sync()
+
+    def flush(self) -> List[Dict[str, Any]]:
+        """Close every window up to the last record seen (end of input)."""
+        closed = []
+        while self._current is not None and self._current <= self._last_ts:
+            closed.append(self._close())
+        return closed
+
+    def _close(self) -> Dict[str, Any]:
+        result = self._sync()
+        self._closed_end = self._current + self.window_seconds
+        self._current = self._current + self.step_seconds
+        return result
+
+    def _sync(self) -> Dict[str, Any]:
+        """Bring the graph up to date with the open window and solve it."""
+        current = self._current
+        window_end = current + self.window_seconds
+        in_window, pending = self._in_window, self._pending
+        removed = []
+        while in_window and in_window[0][0] < current:
+            removed.append(in_window.popleft()[1])
+        # with step > window some records fall between windows and are skipped
+        while pending and pending[0][0] < current:
+            pending.popleft()
+        added = []
+        while pending and pending[0][0] <= window_end:
+            item = pending.popleft()
+            # a late record can sort before ones already counted (after a `peek`);
+            # keep in_window ordered so eviction and duration stay correct
+            if in_window and item[0] < in_window[-1][0]:
+                insort(in_window, item, key=itemgetter(0))
+            else:
+                in_window.append(item)
+            added.append(item[1])
+
+        if self._prev is not None and not added and not removed:
+            self._prev = _reuse_result(self._prev, current, window_end)
+            return self._prev
+
+        duration = in_window[-1][0] - in_window[0][0] if in_window else 0.0
+        G = self.sliding.apply_delta(added, removed, duration)
+        self._prev = _window_result(G, current, window_end, self.source, self.sink, self.capacity_attr)
+        return self._prev
+
+
+def stream_time_windows(chunks: Iterable[List[LogRecord]], source: str, sink: str, window_seconds: int = 60, step_seconds: int = 30, capacity_attr: str = "capacity") -> Iterator[Dict[str, Any]]:
+    """Streaming variant of `analyze_time_windows` for time-ordered logs.
+
+    Consumes record chunks lazily (e.g. from `LogParser.iter_csv`) and yields
+    each window's result as soon as a later record closes it, so only the
+    records of the open window are held in memory. Records must arrive in
+    timestamp order; the windows then match `analyze_time_windows`. Raises
+    ValueError as soon as a record shows up after its window was closed,
+    rather than silently analyzing an unsorted log.
+    """
+    stream = WindowStream(source, sink, window_seconds, step_seconds, capacity_attr)
+    for chunk in chunks:
+        closed = stream.push(chunk)
+        if stream.late:
+            raise ValueError(f"{stream.late} record(s) arrived after their window had closed; the log is not time-ordered")
+        yield from closed
+    yield from stream.flush()
+
+
+def _window_result(G: nx.DiGraph, start_ts: float, end_ts: float, source: str, sink: str, capacity_attr: str) -> Dict[str, Any]:
+    """Solve max-flow/min-cut on one window's graph and package the result."""
+    start = datetime.fromtimestamp(start_ts, tz=timezone.utc)
+    end = datetime.fromtimestamp(end_ts, tz=timezone.utc)
+
+    # ensure source and sink are present (an empty window has neither)
+    if source not in G.nodes or sink not in G.nodes:
+        return {"start": start, "end": end, "flow": 0.0, "min_cut": []}
+
+    try:
+        flow_value, (S, T) = GraphAnalyzer.max_flow_and_cut(G, source, sink, capacity_attr)
+    except Exception:
+        # if algorithm fails (disconnected, etc.)
+        return {"start": start, "end": end, "flow": 0.0, "min_cut": []}
+
+    bottlenecks = GraphAnalyzer.cut_edges(G, S, T)
+    return {"start": start, "end": end, "flow": flow_value, "min_cut": bottlenecks, "cut_value": flow_value}
+
+
+def _reuse_result(prev: Dict[str, Any], start_ts: float, end_ts: float) -> Dict[str, Any]:
+    """Copy a window result for a later window that covers the same records."""
+    start = datetime.fromtimestamp(start_ts, tz=timezone.utc)
+    end = datetime.fromtimestamp(end_ts, tz=timezone.utc)
+    return {**prev, "start": start, "end": end, "min_cut": list(prev["min_cut"])}
+
+
 def aggregate_bottlenecks(window_results: List[Dict[str, Any]], top_k: int = 10) -> List[Tuple[Tuple[str, str], int]]:
     """Count how often each edge appears in min-cuts across windows and return top_k edges."""
-    counter = {}
+    counter = Counter()
     for w in window_results:
-        for e in w.get("min_cut", []):
-            counter[e] = counter.get(e, 0) + 1
-    items = sorted(counter.items(), key=lambda kv: kv[1], reverse=True)
-    return items[:top_k]
+        counter.update(w.get("min_cut", ()))
+    # heap-based partial sort; ties keep first-seen order like a stable sort
+    return counter.most_common(top_k)
@@ -1,9 +1,31 @@
 import networkx as nx
-from typing import List
-from datetime import datetime
+from collections import defaultdict
+from typing import Dict, List, Tuple
 
 from mbd.model.record import LogRecord
 
+# fixed-point scale for `capacity_int` (micro-requests per second)
+CAPACITY_SCALE = 1_000_000
+
+
+def sum_latencies(records: List[LogRecord]) -> Dict[Tuple[str, str], List[float]]:
+    """Aggregate records into {(src, dst): [count, sum_latency]}.
+
+    This is the aggregation kernel shared by `GraphBuilder.build_graph` and
+    `SlidingGraph.apply_delta`: one dict lookup per record, and all per-edge
+    graph updates happen afterwards, once per edge.
+    """
+    sums = {}
+    for r in records:
+        key = (r.src_service, r.dst_service)
+        acc = sums.get(key)
+        if acc is None:
+            sums[key] = [1, r.latency]
+        else:
+            acc[0] += 1
+            acc[1] += r.latency
+    return sums
+
 
 class GraphBuilder:
 
@@ -12,73 +34,113 @@ class GraphBuilder:
         """Builds a directed service graph from log records.
 
         For each edge we store:
-        - times: list of observed latencies (ms)
         - count: number of calls observed
+        - sum_latency: sum of observed latencies (ms)
         - avg_latency: average latency (ms)
         - throughput: estimated calls per second over the observed time span
         - capacity_latency: capacity derived from latency (1 / avg_latency)
         - capacity_throughput: capacity derived from throughput (throughput)
         - capacity: chosen default capacity (throughput if available, otherwise latency-based)
+        - capacity_int: `capacity` scaled by CAPACITY_SCALE and rounded to an int
         """
         G = nx.DiGraph()
 
         timestamps = []
 
         for r in records:
-            src = r.src_service
-            dst = r.dst_service
-            latency = r.latency
-
             # collect timestamps to compute observed time window
             try:
-                ts = datetime.fromisoformat(r.timestamp.replace("Z", "+00:00"))
-                timestamps.append(ts)
+                timestamps.append(r.epoch())
             except Exception:
                 # ignore parse errors; will use fallback duration
                 pass
 
-            if G.has_edge(src, dst):
-                G[src][dst]["times"].append(latency)
-                G[src][dst]["count"] += 1
-            else:
-                G.add_edge(src, dst, times=[latency], count=1)
+        G.add_edges_from(
+            (src, dst, {"count": count, "sum_latency": total})
+            for (src, dst), (count, total) in sum_latencies(records).items()
+        )
 
         # compute time window
         if timestamps:
-            duration = (max(timestamps) - min(timestamps)).total_seconds()
-            if duration <= 0:
-                duration = 1.0
+            duration = max(timestamps) - min(timestamps)
         else:
             duration = 1.0
 
-        for src, dst in G.edges:
-            times = G[src][dst]["times"]
-            count = G[src][dst].get("count", len(times))
-            avg = sum(times) / len(times)
+        GraphBuilder._annotate(G, duration)
+        return G
+
+    @staticmethod
+    def _annotate(G: nx.DiGraph, duration: float) -> None:
+        """Derive per-edge rates/capacities and per-node loads from `count`/`sum_latency`."""
+        if duration <= 0:
+            duration = 1.0
+
+        # per-node throughput totals, accumulated in the same pass over the edges
+        in_throughput = defaultdict(float)
+        out_throughput = defaultdict(float)
+
+        for src, dst, attrs in G.edges(data=True):
+            count = attrs["count"]
+            avg = attrs["sum_latency"] / count
             throughput = count / duration
 
-            G[src][dst]["avg_latency"] = avg
-            G[src][dst]["count"] = count
-            G[src][dst]["throughput"] = throughput
-            G[src][dst]["capacity_latency"] = 1.0 / avg if avg > 0 else 0.0
-            G[src][dst]["capacity_throughput"] = throughput
+            attrs["avg_latency"] = avg
+            attrs["throughput"] = throughput
+            attrs["capacity_latency"] = 1.0 / avg if avg > 0 else 0.0
+            attrs["capacity_throughput"] = throughput
 
             # default capacity prefer throughput when available (represents requests/sec)
-            G[src][dst]["capacity"] = throughput if throughput > 0 else G[src][dst]["capacity_latency"]
-
-        # compute per-node load: sum of incident throughputs (in + out)
-        for n in list(G.nodes):
-            in_throughput = 0.0
-            out_throughput = 0.0
-            for u, v in G.in_edges(n):
-                in_throughput += G[u][v].get("throughput", 0.0)
-            for u, v in G.out_edges(n):
-                out_throughput += G[u][v].get("throughput", 0.0)
-
-            node_load = in_throughput + out_throughput
-            # store load and breakdown
-            G.nodes[n]["load"] = node_load
-            G.nodes[n]["in_throughput"] = in_throughput
-            G.nodes[n]["out_throughput"] = out_throughput
+            attrs["capacity"] = throughput if throughput > 0 else attrs["capacity_latency"]
+            # integer copy: exact flow arithmetic and exact saturation tests in the solver
+            attrs["capacity_int"] = int(round(attrs["capacity"] * CAPACITY_SCALE))
+
+            out_throughput[src] += throughput
+            in_throughput[dst] += throughput
+
+        # per-node load: sum of incident throughputs (in + out), plus the breakdown
+        for n, attrs in G.nodes(data=True):
+            node_in = in_throughput.get(n, 0.0)
+            node_out = out_throughput.get(n, 0.0)
+            attrs["load"] = node_in + node_out
+            attrs["in_throughput"] = node_in
+            attrs["out_throughput"] = node_out
+
+
+class SlidingGraph:
+    """Service graph kept up to date incrementally as a time window slides.
+
+    `apply_delta` adds the records entering the window and retires the ones
+    leaving it, so a step costs O(|delta|) instead of a full `build_graph`.
+    Edge and node attributes match `GraphBuilder.build_graph`.
+    """
+
+    def __init__(self):
+        self.graph = nx.DiGraph()
+
+    def apply_delta(self, add_records: List[LogRecord], remove_records: List[LogRecord], duration: float) -> nx.DiGraph:
+        """Update the graph and re-derive rates for a window spanning `duration` seconds."""
+        G = self.graph
+
+        touched = set()
+        for (src, dst), (count, total) in sum_latencies(remove_records).items():
+            attrs = G[src][dst]
+            attrs["count"] -= count
+            attrs["sum_latency"] -= total
+            if not attrs["count"]:
+                G.remove_edge(src, dst)
+                touched.add(src)
+                touched.add(dst)
+
+        # drop services that no longer have any calls in the window
+        G.remove_nodes_from([n for n in touched if not G.degree(n)])
+
+        for (src, dst), (count, total) in sum_latencies(add_records).items():
+            if G.has_edge(src, dst):
+                attrs = G[src][dst]
+                attrs["count"] += count
+                attrs["sum_latency"] += total
+            else:
+                G.add_edge(src, dst, count=count, sum_latency=total)
 
+        GraphBuilder._annotate(G, duration)
         return G
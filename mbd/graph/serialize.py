@@ -0,0 +1,42 @@
+"""Serialize service graphs into the node/edge dicts the vis.js live page renders."""
+from typing import Any, Dict, Iterable, List, Tuple
+
+import networkx as nx
+
+
+def graph_to_visjs(G: nx.DiGraph, highlighted: Iterable[Tuple[str, str]] = ()) -> Dict[str, List[Dict[str, Any]]]:
+    """Return {"nodes": [...], "edges": [...]} for G.
+
+    Nodes are sized and colored by load relative to the graph's load range;
+    edges are labeled with their average latency and drawn red when in `highlighted`.
+    """
+    return {"nodes": _visjs_nodes(G), "edges": _visjs_edges(G, set(highlighted))}
+
+
+def _visjs_nodes(G: nx.DiGraph) -> List[Dict[str, Any]]:
+    loads = dict(G.nodes(data="load", default=0.0))
+    min_load = min(loads.values()) if loads else 0.0
+    max_load = max(loads.values()) if loads else 0.0
+    span = max_load - min_load
+    shaded = max_load > 0 and span > 0
+    nodes = []
+    for n, load in loads.items():
+        size = 10
+        color = "#97c2fc"
+        if span > 0:
+            frac = (load - min_load) / span
+            size = 10 + frac * 50
+            if shaded:
+                intensity = int(255 * frac)
+                color = f"rgb({min(255, 100 + intensity)},{max(50, 200 - intensity)},{max(50, 200 - intensity // 2)})"
+        nodes.append({"id": n, "label": n, "title": f"{n}\nload={load:.3f}", "size": size, "color": color})
+    return nodes
+
+
+def _visjs_edges(G: nx.DiGraph, highlighted: set) -> List[Dict[str, Any]]:
+    edges = []
+    for u, v, attrs in G.edges(data=True):
+        label = f"{attrs['avg_latency']:.2f}" if "avg_latency" in attrs else ""
+        color = "red" if (u, v) in highlighted else attrs.get("color", "black")
+        edges.append({"from": u, "to": v, "label": label, "color": color, "width": float(attrs.get("penwidth", 1))})
+    return edges
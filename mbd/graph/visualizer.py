@@ -1,5 +1,4 @@
 import networkx as nx
-import pydot
 from pathlib import Path
 from typing import Iterable, Tuple, Optional, List
 
@@ -16,8 +15,6 @@ class GraphVisualizer:
 
         `bottlenecks` is an iterable of (u, v) edges to highlight.
         """
-        dot_path = self.output_dir / "service_graph.dot"
-
         # annotate edges for highlighting
         if bottlenecks:
             highlighted = set(bottlenecks)
@@ -30,11 +27,8 @@ class GraphVisualizer:
                     attrs.setdefault("color", "black")
                     attrs.setdefault("penwidth", "1")
 
-        # Save graph to DOT
-        nx.drawing.nx_pydot.write_dot(graph, dot_path)
-
-        # Render via pydot → Graphviz
-        (graphviz_graph,) = pydot.graph_from_dot_file(str(dot_path))
+        # Render via pydot → Graphviz, straight from the in-memory pydot graph
+        graphviz_graph = nx.drawing.nx_pydot.to_pydot(graph)
         output_path = self.output_dir / filename
         graphviz_graph.write_png(str(output_path))
 
@@ -48,36 +42,33 @@ class GraphVisualizer:
         """
         net = Network(height="800px", width="100%", directed=True, notebook=False)
 
-        # compute min/max load for normalization
-        loads = [graph.nodes[n].get("load", 0.0) for n in graph.nodes]
-        min_load = min(loads) if loads else 0.0
-        max_load = max(loads) if loads else 0.0
+        # read every node's load once; normalization bounds come from the same list
+        loads = list(graph.nodes(data="load", default=0.0))
+        min_load = min((load for _, load in loads), default=0.0)
+        max_load = max((load for _, load in loads), default=0.0)
+        span = max_load - min_load
 
         # add nodes with size based on relative load
-        for n in graph.nodes:
-            load = graph.nodes[n].get("load", 0.0)
+        for n, load in loads:
+            frac = (load - min_load) / span if span > 0 else 0.0
             # normalize to size range 10..60
-            size = 10
-            if max_load > min_load:
-                frac = (load - min_load) / (max_load - min_load)
-                size = 10 + frac * 50
+            size = 10 + frac * 50 if span > 0 else 10
             color = "#97c2fc"
             # more loaded nodes - warmer color
             if max_load > 0:
-                intensity = int(255 * ((load - min_load) / (max_load - min_load)) ) if max_load>min_load else 0
+                intensity = int(255 * frac)
                 # map intensity to color from light blue to red-ish
                 r = min(255, 100 + intensity)
                 g = max(50, 200 - intensity)
-                b = max(50, 200 - intensity//2)
+                b = max(50, 200 - intensity // 2)
                 color = f"rgb({r},{g},{b})"
-            title = n + "\nload=" + f"{load:.3f}"
+            title = f"{n}\nload={load:.3f}"
             net.add_node(n, label=n, title=title, value=size, size=size, color=color)
 
         highlighted = set(highlighted_edges or [])
 
         # add edges
-        for u, v in graph.edges:
-            attrs = graph[u][v]
+        for u, v, attrs in graph.edges(data=True):
             label = ""
             if edge_label_attr and edge_label_attr in attrs:
                 label = f"{attrs[edge_label_attr]:.2f}"
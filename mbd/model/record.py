@@ -1,6 +1,29 @@
-from dataclasses import dataclass
+from dataclasses import dataclass, field
+from datetime import datetime
+from functools import lru_cache
+from typing import Optional
 
-@dataclass
+
+def parse_iso_z(s: str) -> datetime:
+    """Parse an ISO-8601 timestamp, accepting a trailing "Z" for UTC."""
+    try:
+        # Python 3.11+ parses "Z" natively, without the replace() copy
+        return datetime.fromisoformat(s)
+    except ValueError:
+        return datetime.fromisoformat(s.replace("Z", "+00:00"))
+
+
+# log rows carry second-resolution stamps, so consecutive records share the
+# same string: memoizing skips the datetime round-trip for all but the first
+@lru_cache(maxsize=4096)
+def iso_to_epoch(s: str) -> float:
+    """Return an ISO-8601 timestamp (see `parse_iso_z`) as epoch seconds."""
+    return parse_iso_z(s).timestamp()
+
+
+# slots: no per-record __dict__, so large record lists stay compact and
+# attribute reads in the graph builders skip the dict lookup
+@dataclass(slots=True)
 class LogRecord:
     timestamp: str
     src_service: str
@@ -8,3 +31,11 @@ class LogRecord:
     dst_service: str
     dst_endpoint: str
     latency: float
+    # epoch seconds of `timestamp`, filled in by `epoch()` on first use
+    ts_parsed: Optional[float] = field(default=None, compare=False, repr=False)
+
+    def epoch(self) -> float:
+        """Return `timestamp` as epoch seconds, parsing it only once per record."""
+        if self.ts_parsed is None:
+            self.ts_parsed = iso_to_epoch(self.timestamp)
+        return self.ts_parsed
@@ -1,5 +1,7 @@
 import csv
-from typing import List
+import sys
+from itertools import chain, islice
+from typing import Iterator, List
 
 from mbd.model.record import LogRecord
 
@@ -8,23 +10,27 @@ class LogParser:
 
     @staticmethod
     def parse_csv(filepath: str) -> List[LogRecord]:
-        records = []
+        return list(chain.from_iterable(LogParser.iter_csv(filepath)))
 
-        with open(filepath, "r") as f:
-            reader = csv.reader(f)
-            for row in reader:
-                if not row or row[0].startswith("#"):
-                    continue
+    @staticmethod
+    def iter_csv(filepath: str, chunksize: int = 65536) -> Iterator[List[LogRecord]]:
+        """Yield the records of `filepath` in lists of at most `chunksize`.
 
-                timestamp, src, src_ep, dst, dst_ep, latency = row
-                records.append(
-                    LogRecord(
-                        timestamp=timestamp,
-                        src_service=src,
-                        src_endpoint=src_ep,
-                        dst_service=dst,
-                        dst_endpoint=dst_ep,
-                        latency=float(latency),
-                    )
-                )
-        return records
+        Only one chunk is materialized at a time, so streaming consumers such
+        as `stream_time_windows` can process logs larger than memory.
+        """
+        # service/endpoint names repeat on every row: intern them so records
+        # share one string object per name and dict lookups hit by identity
+        intern = sys.intern
+        with open(filepath, "r", newline="") as f:
+            # the C csv reader splits rows; records are built per chunk in a
+            # single comprehension instead of per-row keyword construction
+            rows = (row for row in csv.reader(f) if row and not row[0].startswith("#"))
+            while True:
+                chunk = [
+                    LogRecord(timestamp, intern(src), intern(src_ep), intern(dst), intern(dst_ep), float(latency))
+                    for timestamp, src, src_ep, dst, dst_ep, latency in islice(rows, chunksize)
+                ]
+                if not chunk:
+                    return
+                yield chunk
@@ -11,7 +11,7 @@ from pathlib import Path
 from typing import Any
 
 from mbd.parser import LogParser
-from mbd.graph import analyze_time_windows, aggregate_bottlenecks
+from mbd.graph import analyze_time_windows, stream_time_windows, aggregate_bottlenecks
 
 
 def main():
@@ -22,20 +22,36 @@ def main():
     p.add_argument("--window", type=int, default=60)
     p.add_argument("--step", type=int, default=30)
     p.add_argument("--capacity", dest="capacity_attr", default="capacity")
+    p.add_argument("--adaptive", action="store_true", help="size windows by timestamp density instead of --window/--step")
+    p.add_argument("--workers", type=int, default=1, help="analyze windows in this many processes")
+    p.add_argument("--stream", action="store_true", help="analyze while reading, holding only the open window in memory (log must be time-ordered)")
     p.add_argument("--out", dest="outfile", default="out/analysis.json")
     p.add_argument("--viz", dest="vizfile", default=None, help="generate interactive HTML visualization")
     args = p.parse_args()
+    if args.stream and (args.adaptive or args.workers > 1):
+        p.error("--stream cannot be combined with --adaptive or --workers")
 
     infile = Path(args.infile)
     outfile = Path(args.outfile)
     outfile.parent.mkdir(parents=True, exist_ok=True)
 
-    print(f"Parsing logs from {infile}")
-    records = LogParser.parse_csv(str(infile))
-    print(f"Parsed {len(records)} records")
-
-    print(f"Running sliding-window analysis: window={args.window}s step={args.step}s capacity={args.capacity_attr}")
-    results = analyze_time_windows(records, source=args.source, sink=args.sink, window_seconds=args.window, step_seconds=args.step, capacity_attr=args.capacity_attr)
+    if args.stream:
+        print(f"Streaming sliding-window analysis of {infile}: window={args.window}s step={args.step}s capacity={args.capacity_attr}")
+        chunks = LogParser.iter_csv(str(infile))
+        try:
+            results = list(stream_time_windows(chunks, source=args.source, sink=args.sink, window_seconds=args.window, step_seconds=args.step, capacity_attr=args.capacity_attr))
+        except ValueError as e:
+            p.error(f"--stream: {e}; run without --stream to analyze it")
+    else:
+        print(f"Parsing logs from {infile}")
+        records = LogParser.parse_csv(str(infile))
+        print(f"Parsed {len(records)} records")
+
+        if args.adaptive:
+            print(f"Running adaptive-window analysis: capacity={args.capacity_attr}")
+        else:
+            print(f"Running sliding-window analysis: window={args.window}s step={args.step}s capacity={args.capacity_attr}")
+        results = analyze_time_windows(records, source=args.source, sink=args.sink, window_seconds=args.window, step_seconds=args.step, capacity_attr=args.capacity_attr, adaptive=args.adaptive, workers=args.workers)
 
     agg = aggregate_bottlenecks(results, top_k=20)
 
@@ -45,6 +61,7 @@ def main():
         "sink": args.sink,
         "window": args.window,
         "step": args.step,
+        "adaptive": args.adaptive,
         "capacity_attr": args.capacity_attr,
         "windows": [] ,
         "aggregated_bottlenecks": [ {"edge": [e[0], e[1]], "count": c} for e,c in agg ]
@@ -72,6 +89,8 @@ def main():
         from mbd.graph import GraphBuilder, GraphVisualizer
 
         print(f"Building full graph for viz and highlighting top aggregated edges")
+        if args.stream:
+            records = LogParser.parse_csv(str(infile))
         G_full = GraphBuilder.build_graph(records)
         viz_out_dir = Path(args.vizfile).parent
         viz = GraphVisualizer(output_dir=str(viz_out_dir) if viz_out_dir != Path('.') else "out")
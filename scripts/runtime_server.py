@@ -1,153 +1,233 @@
 import argparse
 import csv
 import json
+import multiprocessing
+import os
+import queue
+import sys
 import threading
 import time
 from collections import deque
-from datetime import datetime, timedelta
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from functools import partial
+from pathlib import Path
+from typing import List, Optional
 
-from flask import Flask, jsonify, send_file
+from flask import Flask, Response, jsonify, send_file, send_from_directory
+from werkzeug.exceptions import NotFound
 
 from mbd.model.record import LogRecord
-from mbd.graph.bottleneck import analyze_time_windows, aggregate_bottlenecks
+from mbd.graph.graph_builder import GraphBuilder
+from mbd.graph.bottleneck import WindowStream, aggregate_bottlenecks
+from mbd.graph.serialize import graph_to_visjs
 from mbd.graph.visualizer import GraphVisualizer
 
 
-def parse_csv_line(line: str) -> LogRecord:
-    # robust CSV parse for a single line
-    reader = csv.reader([line])
-    row = next(reader)
-    if not row or row[0].startswith("#"):
-        return None
-    timestamp, src, src_ep, dst, dst_ep, latency = row
-    return LogRecord(timestamp=timestamp, src_service=src, src_endpoint=src_ep, dst_service=dst, dst_endpoint=dst_ep, latency=float(latency))
+def parse_csv_line(line: str) -> Optional[LogRecord]:
+    """Parse a single CSV line; None for comments and malformed rows."""
+    records = parse_csv_lines([line])
+    return records[0] if records else None
+
+
+def parse_csv_lines(lines: List[str]) -> List[LogRecord]:
+    """Parse a batch of raw CSV lines with one reader, skipping comments and malformed rows."""
+    # names repeat on every row: intern them (as LogParser does) so the retained
+    # history shares one string per service/endpoint instead of one per record;
+    # this is the only place runtime records are built, parse_csv_line included
+    intern = sys.intern
+    records = []
+    for row in csv.reader(lines):
+        if not row or row[0].startswith("#"):
+            continue
+        try:
+            timestamp, src, src_ep, dst, dst_ep, latency = row
+            rec = LogRecord(timestamp, intern(src), intern(src_ep), intern(dst), intern(dst_ep), float(latency))
+            # parse the timestamp once at ingest; a malformed one skips the row
+            rec.epoch()
+        except Exception:
+            continue
+        records.append(rec)
+    return records
+
+
+# Flask resolves relative send_file paths against scripts/, not the working directory
+REPO_ROOT = Path(__file__).resolve().parents[1]
+LIVE_PAGE = REPO_ROOT / 'resources' / 'graph_live.html'
+PYVIS_PAGE = "runtime_graph.html"  # rendered into the analyzer's visualizer.output_dir
+LIB_MAX_AGE = 365 * 24 * 3600
+
+
+def _encode_json(data) -> bytes:
+    """Compact JSON body, encoded once so repeated requests can resend the bytes."""
+    return json.dumps(data, separators=(",", ":")).encode()
+
+
+def _json_response(body: bytes) -> Response:
+    return Response(body, mimetype="application/json")
+
+
+def _tick(stream: WindowStream, records: List[LogRecord]):
+    """Feed new records to the stream; return (closed windows, open window, open window graph)."""
+    closed = stream.push(records)
+    return closed, stream.peek(), stream.graph
+
+
+# the worker process's WindowStream when analyze_loop runs with use_process
+_worker_stream = None
+
+
+def _init_worker_stream(*stream_args):
+    global _worker_stream
+    _worker_stream = WindowStream(*stream_args)
+
+
+def _worker_tick(records: List[LogRecord]):
+    return _tick(_worker_stream, records)
+
+
+def _start_worker(stream_args) -> ProcessPoolExecutor:
+    # spawn rather than fork: the parent already runs the tail and Flask threads,
+    # and forking a multithreaded process can deadlock the child
+    return ProcessPoolExecutor(max_workers=1, mp_context=multiprocessing.get_context("spawn"), initializer=_init_worker_stream, initargs=stream_args)
 
 
 class RuntimeAnalyzer:
-    def __init__(self, log_path: str, source: str, sink: str, window: int = 60, step: int = 30, capacity: str = "capacity"):
+    def __init__(self, log_path: str, source: str, sink: str, window: int = 60, step: int = 30, capacity: str = "capacity", max_records: int = 100_000, use_process: bool = False):
         self.log_path = log_path
         self.source = source
         self.sink = sink
         self.window = window
         self.step = step
         self.capacity = capacity
-
-        self.records = []
+        # run the window analysis in a worker process, off this process's GIL
+        self.use_process = use_process
+
+        # tail_loop -> analyze_loop handoff of parsed record batches (one item per
+        # batch, not per record); SimpleQueue never blocks the producer
+        self.incoming = queue.SimpleQueue()
+        # bounded history: the oldest records fall off once max_records is reached,
+        # so memory and the /graph-agg snapshot copy stay constant on long runs.
+        # Only analyze_loop appends; the lock guards it against /graph-agg copies.
+        self.records = deque(maxlen=max_records)
+        self.records_seen = 0  # total records ever added to the history
         self.lock = threading.Lock()
-        self.latest_windows = []
-        self.latest_bottlenecks = []
-        self.latest_graph = None
+        # latest results, replaced as a whole by analyze_loop (never mutated in place)
+        # so request handlers read a consistent snapshot without locking
+        self.latest = {"windows": [], "bottlenecks": [], "graph": None}
+        # /graph-agg body as (records_seen, monotonic time, JSON bytes); rebuilt only
+        # when new records arrived and the cached one is older than agg_cache_seconds
+        self._agg_cache = None
+        self.agg_cache_seconds = 2.0
+        # pyvis HTML is only rendered once /pyvis has asked for it and the graph changed
+        self._pyvis_dirty = False
+        self._pyvis_wanted = False
 
         self.visualizer = GraphVisualizer(output_dir="out")
 
-    def tail_loop(self, poll_interval: float = 0.5):
+    def tail_loop(self, poll_interval: float = 0.5, min_poll_interval: float = 0.01, batch_size: int = 256):
         # open and seek to end
         with open(self.log_path, "r") as f:
             f.seek(0, 2)
+            # back off from min_poll_interval to poll_interval while the file is idle,
+            # so a busy log is picked up within milliseconds and an idle one costs little
+            delay = min_poll_interval
+            batch = []
             while True:
                 line = f.readline()
+                if line:
+                    batch.append(line)
+                    delay = min_poll_interval
+                # parse at EOF or once batch_size lines are buffered
+                if batch and (not line or len(batch) >= batch_size):
+                    records = parse_csv_lines(batch)
+                    if records:
+                        self.incoming.put(records)
+                    batch = []
                 if not line:
-                    time.sleep(poll_interval)
-                    continue
-                try:
-                    rec = parse_csv_line(line.strip())
-                except Exception:
-                    continue
-                if rec is None:
-                    continue
-                with self.lock:
-                    self.records.append(rec)
+                    time.sleep(delay)
+                    delay = min(delay * 2, poll_interval)
 
     def analyze_loop(self, analyze_interval: float = 5.0):
+        # windows are analyzed incrementally: each tick feeds only the records that
+        # arrived since the last one, and closed windows are kept, not recomputed
+        stream_args = (self.source, self.sink, self.window, self.step, self.capacity)
+        if self.use_process:
+            # one worker keeps the stream state; each tick ships it only the new records
+            pool = _start_worker(stream_args)
+
+            def tick(records):
+                return pool.submit(_worker_tick, records).result()
+        else:
+            tick = partial(_tick, WindowStream(*stream_args))
+        closed = deque()
         while True:
             time.sleep(analyze_interval)
+            new_records = []
+            while True:
+                try:
+                    new_records.extend(self.incoming.get_nowait())
+                except queue.Empty:
+                    break
             with self.lock:
-                records_copy = list(self.records)
-            if not records_copy:
+                self.records.extend(new_records)
+                self.records_seen += len(new_records)
+            if not self.records:
                 continue
+            oldest = self.records[0].epoch()
+            if new_records:
+                self._pyvis_dirty = True
 
-            # run sliding-window analysis on available records
+            # run sliding-window analysis on the new records
             try:
-                windows = analyze_time_windows(records_copy, self.source, self.sink, self.window, self.step, capacity_attr=self.capacity)
+                try:
+                    new_closed, open_window, G = tick(new_records)
+                except BrokenProcessPool:
+                    # the worker died and took the stream state with it: start a new
+                    # one and rebuild the windows from the retained history
+                    print("[WARN] analysis worker died; restarting it from the retained records", file=sys.stderr)
+                    pool.shutdown(wait=False)
+                    pool = _start_worker(stream_args)
+                    closed.clear()
+                    with self.lock:
+                        history = list(self.records)
+                    new_closed, open_window, G = tick(history)
+                closed.extend(new_closed)
+                # forget windows older than the retained record history
+                while closed and closed[0]["start"].timestamp() < oldest:
+                    closed.popleft()
+                windows = list(closed) + [open_window]
                 top = aggregate_bottlenecks(windows, top_k=10)
             except Exception:
                 windows = []
                 top = []
 
-            with self.lock:
-                self.latest_windows = windows
-                self.latest_bottlenecks = top
-
-            # NOTE: don't try to build `latest_graph` from an undefined G here.
-            # We'll build latest_graph below when we have `windows` and construct G.
+            self.latest = {**self.latest, "windows": windows, "bottlenecks": top}
 
             # update interactive graph HTML to reflect current loads and highlight top bottlenecks
             if windows:
-                # pick last window's graph for visualization
-                last_window = windows[-1]
-                # build graph anew from the records in the last window
+                # visualize the open window's graph, kept up to date by the stream
                 try:
-                    from mbd.graph.graph_builder import GraphBuilder
-
-                    # use end of last window to filter records
-                    start = last_window.get("start")
-                    end = last_window.get("end")
-                    # filter records by timestamp range (string ISO)
-                    def in_range(r):
-                        try:
-                            ts = datetime.fromisoformat(r.timestamp.replace("Z", "+00:00"))
-                            return start <= ts <= end
-                        except Exception:
-                            return False
-
-                    window_recs = [r for r in records_copy if in_range(r)]
-                    G = GraphBuilder.build_graph(window_recs)
                     highlighted = [e for e, cnt in top[:5]]
-                    # build serializable latest_graph from G (used by /graph-data & /graph-live)
+                    # build latest["graph"] from G as encoded JSON (served by /graph-data & /graph-live)
                     try:
-                        nodes = []
-                        edges = []
-                        loads = [G.nodes[n].get("load", 0.0) for n in G.nodes]
-                        min_load = min(loads) if loads else 0.0
-                        max_load = max(loads) if loads else 0.0
-                        for n in G.nodes:
-                            load = G.nodes[n].get("load", 0.0)
-                            size = 10
-                            if max_load > min_load:
-                                frac = (load - min_load) / (max_load - min_load)
-                                size = 10 + frac * 50
-                            color = "#97c2fc"
-                            if max_load > 0 and max_load > min_load:
-                                intensity = int(255 * ((load - min_load) / (max_load - min_load)))
-                                r = min(255, 100 + intensity)
-                                g = max(50, 200 - intensity)
-                                b = max(50, 200 - intensity // 2)
-                                color = f"rgb({r},{g},{b})"
-                            title = f"{n}\nload={load:.3f}"
-                            nodes.append({"id": n, "label": n, "title": title, "size": size, "color": color})
-
-                        for u, v in G.edges:
-                            attrs = G[u][v]
-                            label = ""
-                            if "avg_latency" in attrs:
-                                label = f"{attrs['avg_latency']:.2f}"
-                            color = "red" if (u, v) in highlighted else attrs.get("color", "black")
-                            width = float(attrs.get("penwidth", 1))
-                            edges.append({"from": u, "to": v, "label": label, "color": color, "width": width})
-
-                        with self.lock:
-                            self.latest_graph = {"nodes": nodes, "edges": edges}
+                        self.latest = {**self.latest, "graph": _encode_json(graph_to_visjs(G, highlighted))}
                     except Exception:
                         pass
 
-                    # also render pyvis HTML for convenience
-                    self.visualizer.render_pyvis(G, filename="runtime_graph.html", highlighted_edges=highlighted, edge_label_attr="avg_latency")
+                    # also render pyvis HTML for convenience, when someone is viewing it
+                    if self._pyvis_wanted and self._pyvis_dirty:
+                        self.visualizer.render_pyvis(G, filename=PYVIS_PAGE, highlighted_edges=highlighted, edge_label_attr="avg_latency")
+                        self._pyvis_dirty = False
+                        self._pyvis_wanted = False
                 except Exception:
                     pass
 
 
-def create_app(analyzer: RuntimeAnalyzer):
+def create_app(analyzer: RuntimeAnalyzer, x_sendfile: bool = False):
     app = Flask(__name__)
+    # behind nginx/Apache, let the proxy send static files itself (X-Sendfile)
+    app.config["USE_X_SENDFILE"] = x_sendfile
 
     @app.route("/health")
     def health():
@@ -155,105 +235,118 @@ def create_app(analyzer: RuntimeAnalyzer):
 
     @app.route("/alerts")
     def alerts():
-        with analyzer.lock:
-            data = {"bottlenecks": analyzer.latest_bottlenecks, "windows": len(analyzer.latest_windows)}
+        latest = analyzer.latest
+        data = {"bottlenecks": latest["bottlenecks"], "windows": len(latest["windows"])}
         return jsonify(data)
 
+    # the visualizer writes relative to the working directory, not scripts/
+    pyvis_page = analyzer.visualizer.output_dir.resolve() / PYVIS_PAGE
+
     @app.route("/graph")
     def graph():
         # Serve the interactive live visualization page (default)
         # This page polls /graph-data or /graph-agg and renders using vis.js.
         try:
-            return send_file('resources/graph_live.html')
+            return send_file(LIVE_PAGE)
         except Exception:
             # fallback to the pyvis-generated HTML if present
-            path = "out/runtime_graph.html"
             try:
-                return send_file(path)
+                return send_file(pyvis_page)
             except Exception:
                 return "graph not ready", 503
 
     @app.route('/pyvis')
     def pyvis_graph():
-        path = "out/runtime_graph.html"
+        # ask analyze_loop to (re)render on its next tick; serve the last render meanwhile
+        analyzer._pyvis_wanted = True
         try:
-            return send_file(path)
+            return send_file(pyvis_page)
         except Exception:
             return "pyvis graph not ready", 503
 
     @app.route("/graph-data")
     def graph_data():
-        with analyzer.lock:
-            gd = analyzer.latest_graph
+        gd = analyzer.latest["graph"]
         if not gd:
             return jsonify({"nodes": [], "edges": []}), 204
-        return jsonify(gd)
+        return _json_response(gd)
+
+    # serve local lib files (e.g., vis-network JS/CSS)
+    lib_dir = REPO_ROOT / 'lib'
 
     @app.route('/lib/<path:fname>')
     def lib_file(fname):
-        # serve local lib files (e.g., vis-network JS/CSS)
-        from pathlib import Path
-        base = Path(__file__).resolve().parents[1] / 'lib'
-        target = base / fname
-        if not target.exists():
+        # only the versioned vis-x.y.z/ bundles may be cached for good; others such
+        # as bindings/utils.js can change in place and get the default revalidation
+        versioned = fname.startswith('vis-')
+        try:
+            response = send_from_directory(lib_dir, fname, max_age=LIB_MAX_AGE if versioned else None)
+        except NotFound:
             return "not found", 404
-        return send_file(str(target))
-        @app.route('/graph-live')
-        def graph_live():
-                try:
-                        return send_file('resources/graph_live.html')
-                except Exception:
-                        return "graph-live not ready", 503
+        if versioned:
+            response.cache_control.immutable = True
+        return response
 
-    @app.route('/graph-agg')
-    def graph_agg():
-        # build aggregated graph from all records seen so far (useful to show full topology)
+    @app.route('/graph-live')
+    def graph_live():
+        # static HTML that polls for data: browsers may keep it briefly
         try:
-            from mbd.graph.graph_builder import GraphBuilder
+            return send_file(LIVE_PAGE, max_age=30)
         except Exception:
-            return jsonify({"nodes": [], "edges": []}), 500
+            return "graph-live not ready", 503
 
+    @app.route('/graph-agg')
+    def graph_agg():
+        # build aggregated graph from the retained history, i.e. the most recent
+        # --max-records records (useful to show full topology)
+        now = time.monotonic()
         with analyzer.lock:
+            seen = analyzer.records_seen
+            cached = analyzer._agg_cache
+            if cached is not None and (cached[0] == seen or now - cached[1] < analyzer.agg_cache_seconds):
+                return _json_response(cached[2])
             records_copy = list(analyzer.records)
         if not records_copy:
             return jsonify({"nodes": [], "edges": []}), 204
 
         G = GraphBuilder.build_graph(records_copy)
-        nodes = []
-        edges = []
-        loads = [G.nodes[n].get("load", 0.0) for n in G.nodes]
-        min_load = min(loads) if loads else 0.0
-        max_load = max(loads) if loads else 0.0
-        for n in G.nodes:
-            load = G.nodes[n].get("load", 0.0)
-            size = 10
-            if max_load > min_load:
-                frac = (load - min_load) / (max_load - min_load)
-                size = 10 + frac * 50
-            color = "#97c2fc"
-            if max_load > 0 and max_load > min_load:
-                intensity = int(255 * ((load - min_load) / (max_load - min_load)))
-                r = min(255, 100 + intensity)
-                g = max(50, 200 - intensity)
-                b = max(50, 200 - intensity // 2)
-                color = f"rgb({r},{g},{b})"
-            title = f"{n}\nload={load:.3f}"
-            nodes.append({"id": n, "label": n, "title": title, "size": size, "color": color})
-
-        for u, v in G.edges:
-            attrs = G[u][v]
-            label = ""
-            if "avg_latency" in attrs:
-                label = f"{attrs['avg_latency']:.2f}"
-            color = attrs.get("color", "black")
-            width = float(attrs.get("penwidth", 1))
-            edges.append({"from": u, "to": v, "label": label, "color": color, "width": width})
-
-        return jsonify({"nodes": nodes, "edges": edges})
+        body = _encode_json(graph_to_visjs(G))
+        analyzer._agg_cache = (seen, now, body)
+        return _json_response(body)
 
     return app
 
 
+def start_threads(analyzer: RuntimeAnalyzer):
+    t_tail = threading.Thread(target=analyzer.tail_loop, name="tail-loop", daemon=True)
+    t_analyze = threading.Thread(target=analyzer.analyze_loop, name="analyze-loop", daemon=True)
+    t_tail.start()
+    t_analyze.start()
+
+
+def app_from_env():
+    """WSGI app factory for running under a production server, configured from MBD_* env vars.
+
+    The analyzer threads live in the serving process, so run a single worker
+    and scale with threads, e.g. from the repository root:
+
+    MBD_SOURCE=api-gateway MBD_SINK=db-user PYTHONPATH=.:scripts gunicorn -w 1 -k gthread --threads 8 'runtime_server:app_from_env()'
+    """
+    env = os.environ
+    analyzer = RuntimeAnalyzer(
+        env.get("MBD_LOG", "resources/logs.csv"),
+        env["MBD_SOURCE"],
+        env["MBD_SINK"],
+        int(env.get("MBD_WINDOW", 60)),
+        int(env.get("MBD_STEP", 30)),
+        env.get("MBD_CAPACITY", "capacity"),
+        int(env.get("MBD_MAX_RECORDS", 100_000)),
+        env.get("MBD_PROCESS", "") not in ("", "0"),
+    )
+    start_threads(analyzer)
+    return create_app(analyzer, x_sendfile=env.get("MBD_X_SENDFILE", "") not in ("", "0"))
+
+
 def main():
     parser = argparse.ArgumentParser(description="Runtime bottleneck detector (tail log & serve alerts)")
     parser.add_argument("--log", dest="log", default="resources/logs.csv", help="CSV log file to tail")
@@ -263,17 +356,16 @@ def main():
     parser.add_argument("--window", dest="window", type=int, default=60)
     parser.add_argument("--step", dest="step", type=int, default=30)
     parser.add_argument("--capacity", dest="capacity", default="capacity")
+    parser.add_argument("--max-records", dest="max_records", type=int, default=100_000, help="most recent records kept in memory for analysis")
+    parser.add_argument("--process", dest="use_process", action="store_true", help="run the window analysis in a separate process")
+    parser.add_argument("--x-sendfile", dest="x_sendfile", action="store_true", help="serve static files via X-Sendfile (needs a proxy that honors it)")
     args = parser.parse_args()
 
-    analyzer = RuntimeAnalyzer(args.log, args.source, args.sink, args.window, args.step, args.capacity)
-
-    t_tail = threading.Thread(target=analyzer.tail_loop, name="tail-loop", daemon=True)
-    t_analyze = threading.Thread(target=analyzer.analyze_loop, name="analyze-loop", daemon=True)
-    t_tail.start()
-    t_analyze.start()
+    analyzer = RuntimeAnalyzer(args.log, args.source, args.sink, args.window, args.step, args.capacity, args.max_records, args.use_process)
+    start_threads(analyzer)
 
-    app = create_app(analyzer)
-    app.run(host="0.0.0.0", port=args.port, debug=False)
+    app = create_app(analyzer, x_sendfile=args.x_sendfile)
+    app.run(host="0.0.0.0", port=args.port, debug=False, threaded=True)
 
 
 if __name__ == "__main__":
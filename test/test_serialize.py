@@ -0,0 +1,81 @@
+import json
+
+import networkx as nx
+
+from mbd.graph.graph_builder import GraphBuilder
+from mbd.graph.serialize import graph_to_visjs
+from mbd.model.record import LogRecord
+
+
+def reference_visjs(G, highlighted=()):
+    """The node/edge loops analyze_loop and /graph-agg ran before graph_to_visjs."""
+    nodes = []
+    edges = []
+    loads = [G.nodes[n].get("load", 0.0) for n in G.nodes]
+    min_load = min(loads) if loads else 0.0
+    max_load = max(loads) if loads else 0.0
+    for n in G.nodes:
+        load = G.nodes[n].get("load", 0.0)
+        size = 10
+        if max_load > min_load:
+            frac = (load - min_load) / (max_load - min_load)
+            size = 10 + frac * 50
+        color = "#97c2fc"
+        if max_load > 0 and max_load > min_load:
+            intensity = int(255 * ((load - min_load) / (max_load - min_load)))
+            r = min(255, 100 + intensity)
+            g = max(50, 200 - intensity)
+            b = max(50, 200 - intensity // 2)
+            color = f"rgb({r},{g},{b})"
+        title = f"{n}\nload={load:.3f}"
+        nodes.append({"id": n, "label": n, "title": title, "size": size, "color": color})
+
+    for u, v in G.edges:
+        attrs = G[u][v]
+        label = ""
+        if "avg_latency" in attrs:
+            label = f"{attrs['avg_latency']:.2f}"
+        color = "red" if (u, v) in highlighted else attrs.get("color", "black")
+        width = float(attrs.get("penwidth", 1))
+        edges.append({"from": u, "to": v, "label": label, "color": color, "width": width})
+    return {"nodes": nodes, "edges": edges}
+
+
+def encode(data):
+    return json.dumps(data, separators=(",", ":")).encode()
+
+
+def test_matches_reference_with_highlighted_edge():
+    records = [
+        LogRecord("2025-11-21T15:07:12Z", "api-gateway", "/a", "user-service", "/u", 12.0),
+        LogRecord("2025-11-21T15:07:13Z", "user-service", "/u", "db-user", "/q", 80.5),
+        LogRecord("2025-11-21T15:07:14Z", "user-service", "/u", "db-user", "/q", 60.0),
+        LogRecord("2025-11-21T15:07:15Z", "api-gateway", "/a", "post-service", "/p", 30.0),
+    ]
+    G = GraphBuilder.build_graph(records)
+    G["api-gateway"]["post-service"]["color"] = "blue"
+    G["api-gateway"]["post-service"]["penwidth"] = 3
+    highlighted = [("user-service", "db-user")]
+
+    result = graph_to_visjs(G, highlighted)
+    assert encode(result) == encode(reference_visjs(G, highlighted))
+    assert [e["color"] for e in result["edges"] if (e["from"], e["to"]) in highlighted] == ["red"]
+
+
+def test_matches_reference_when_all_loads_are_equal():
+    G = nx.DiGraph()
+    G.add_edge("a", "b")
+    G.add_node("c")
+    for n in G.nodes:
+        G.nodes[n]["load"] = 0.5
+
+    result = graph_to_visjs(G)
+    assert encode(result) == encode(reference_visjs(G))
+    assert {n["size"] for n in result["nodes"]} == {10}
+    assert {n["color"] for n in result["nodes"]} == {"#97c2fc"}
+
+
+if __name__ == "__main__":
+    test_matches_reference_with_highlighted_edge()
+    test_matches_reference_when_all_loads_are_equal()
+    print("ok")
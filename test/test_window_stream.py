@@ -0,0 +1,83 @@
+from datetime import datetime, timezone
+from pathlib import Path
+
+from mbd.graph.bottleneck import WindowStream, analyze_time_windows, stream_time_windows, _window_result
+from mbd.graph.graph_builder import GraphBuilder
+from mbd.model.record import LogRecord
+from mbd.parser.log_parser import LogParser
+
+SOURCE, SINK = "api-gateway", "db-user"
+T0 = 1763737632.0  # 2025-11-21T15:07:12Z
+
+
+def record(offset, src=SOURCE, dst=SINK, latency=10.0):
+    ts = datetime.fromtimestamp(T0 + offset, tz=timezone.utc).strftime("%Y-%m-%dT%H:%M:%SZ")
+    return LogRecord(ts, src, "/a", dst, "/b", latency)
+
+
+def window_times(stream):
+    return [ts for ts, _ in stream._in_window]
+
+
+def test_late_record_after_peek_is_counted_in_order():
+    stream = WindowStream(SOURCE, SINK, 60, 30)
+    early = [record(0), record(10, latency=20.0), record(20)]
+    stream.push(early)
+    stream.peek()
+
+    # arrives after the peek but still inside the open window
+    late = record(5, latency=40.0)
+    stream.push([late])
+    stream.peek()
+    assert window_times(stream) == sorted(window_times(stream))
+    assert stream.graph[SOURCE][SINK]["count"] == 4
+
+    tail = [record(100)]
+    results = stream.push(tail) + stream.flush()
+    assert results == analyze_time_windows(early + [late] + tail, SOURCE, SINK, 60, 30)
+
+
+def test_window_graph_matches_its_records_with_reordered_input():
+    records = LogParser.parse_csv(str(Path(__file__).resolve().parents[1] / "resources" / "logs_large.csv"))
+    for i in range(0, len(records) - 3, 7):
+        records[i], records[i + 3] = records[i + 3], records[i]
+
+    stream = WindowStream(SOURCE, SINK, 60, 30)
+    for i in range(0, len(records), 50):
+        stream.push(records[i:i + 50])
+        result = stream.peek()
+
+        times = window_times(stream)
+        assert times == sorted(times)
+        assert not times or times[0] >= stream._current
+        # the incrementally kept graph solves like one rebuilt from the window's records
+        G = GraphBuilder.build_graph([r for _, r in stream._in_window])
+        expected = _window_result(G, stream._current, stream._current + 60, SOURCE, SINK, "capacity")
+        assert abs(result["flow"] - expected["flow"]) < 1e-9
+        assert sorted(result["min_cut"]) == sorted(expected["min_cut"])
+
+
+def test_stream_rejects_records_older_than_closed_windows():
+    stream = WindowStream(SOURCE, SINK, 60, 30)
+    stream.push([record(0), record(100), record(10)])
+    assert stream.late == 1
+
+    # 40 lies in the open window [30, 90] but also in the closed [0, 60]
+    stream = WindowStream(SOURCE, SINK, 60, 30)
+    stream.push([record(0), record(61), record(40)])
+    assert stream.late == 1
+
+    for chunks in ([[record(0), record(100)], [record(10)]], [[record(0), record(61), record(40)]]):
+        try:
+            list(stream_time_windows(chunks, SOURCE, SINK, 60, 30))
+        except ValueError:
+            pass
+        else:
+            raise AssertionError("unsorted input was analyzed silently")
+
+
+if __name__ == "__main__":
+    test_late_record_after_peek_is_counted_in_order()
+    test_window_graph_matches_its_records_with_reordered_input()
+    test_stream_rejects_records_older_than_closed_windows()
+    print("ok")